@@ -4,11 +4,47 @@ Created on Sat Feb  5 19:57:51 2022
 
 @author: yr3g17
 """
-from matplotlib import pyplot as plt
+import functools
+
 import numpy as np
-from scipy import integrate as sig
 
-from thinaerofoils.nacafoils import parse_NACA4digit
+from thinaerofoils.nacafoils import _decode_NACA4digit, parse_NACA4digit
+
+
+def _f_A_base(maxcamber: float, loccamber: float, nmax: int) -> np.ndarray:
+    """Return the angle of attack independent part of An coefficients"""
+    # In theta-space, An = 2/pi * integral(dzdx * cos(n*theta), 0, pi). Either
+    # side of the max camber location theta_p, the camber gradient is of the
+    # form dzdx = a + b*cos(theta), so each piece integrates exactly in terms
+    # of I(m) = integral(cos(m*theta)) for m = n-1, n, and n+1
+    theta_p = np.arccos(1 - 2 * loccamber)
+    ms = np.arange(-1, nmax + 2)
+    nonzero = ms != 0
+
+    integrals = np.zeros(nmax + 1)
+    for (t1, t2), coef in (((0, theta_p), loccamber**-2),
+                           ((theta_p, np.pi), (1 - loccamber)**-2)):
+        a = 2 * maxcamber * coef * (loccamber - 0.5)
+        b = maxcamber * coef
+        I = np.empty(len(ms))
+        I[nonzero] = (
+            np.sin(ms[nonzero] * t2) - np.sin(ms[nonzero] * t1)) / ms[nonzero]
+        I[~nonzero] = t2 - t1
+        integrals += a * I[1:-1] + b / 2 * (I[:-2] + I[2:])
+
+    A_base = 2 / np.pi * integrals
+    A_base[0] /= 2
+    return A_base
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_A_base(foil: str) -> np.ndarray:
+    """Return the (read-only) An coefficient base of a foil, nmax of 100"""
+    # Only the camber is needed, so skip building any display geometry
+    maxcamber, loccamber, _ = _decode_NACA4digit(foil)
+    A_base = _f_A_base(maxcamber, loccamber, nmax=100)
+    A_base.flags.writeable = False  # shared between all callers
+    return A_base
 
 
 class NACA4digit:
@@ -19,22 +55,26 @@ class NACA4digit:
         if xres is None:
             xres = 100
 
-        coords, f_z, f_dzdx = parse_NACA4digit(foil, xres)
+        geom, f_z, f_dzdx = parse_NACA4digit(foil, xres)
 
         self.foil = foil
         self.xres = xres
-        self.coords = coords
+        self.geom = geom
         self.f_z = f_z
         self.f_dzdx = f_dzdx
 
-        def f_0lift_integrand(x):
-            theta0 = np.arccos(1 - 2 * x)
-            result = f_dzdx(x) * (1 - np.cos(theta0)) * 2 / np.sin(theta0)
-            return result
-        self.zeroliftAoA_rad = 1 / np.pi * sig.quad(f_0lift_integrand, 0, 1)[0]
+        # The camber-dependent part of the Fourier coefficients is independent
+        # of angle of attack, so it need only be integrated once per aerofoil
+        self._A_base = _cached_A_base(foil)
+        self.zeroliftAoA_rad = self._A_base[0] - self._A_base[1] / 2
 
         return None
 
+    @property
+    def coords(self) -> np.ndarray:
+        """Surface coordinates of the aerofoil, as an array of [xs, ys]"""
+        return np.array([self.geom.x, self.geom.y])
+
     def __repr__(self):
         foil = self.foil
         xres = self.xres
@@ -42,11 +82,13 @@ class NACA4digit:
 
     def show(self) -> None:
         """Call to create a figure showing off the aerofoil's profile"""
+        from matplotlib import pyplot as plt  # deferred, as import is slow
+
         xs = np.linspace(0, 1, self.xres)
 
         fig, ax = plt.subplots(1, subplot_kw={"aspect": 1}, dpi=150)
         ax.set_title(f"NACA {self.foil}")
-        ax.plot(*self.coords, "black")
+        ax.plot(self.geom.x, self.geom.y, "black")
         ax.plot(xs, self.f_z(xs), "r")
         ax.plot((0, 1), (0, 0), ls="-.", c="black")
         ax.set_xlabel("x/c")
@@ -56,6 +98,8 @@ class NACA4digit:
 
     def show2(self) -> None:
         """Create a tile of plots summarising the aerofoil's characteristics"""
+        from matplotlib import pyplot as plt  # deferred, as import is slow
+
         fig, axd = plt.subplot_mosaic(
             [['foil', 'foil'], ['lift', 'moment']],
             constrained_layout=True, dpi=100, figsize=(8*0.9, 5*0.9))
@@ -63,21 +107,21 @@ class NACA4digit:
 
         # Plot the aerofoil profile
         xs = np.linspace(0, 1, self.xres)
-        axd["foil"].plot(*self.coords, c="black")
-        axd["foil"].fill_between(*self.coords, color="black", alpha=0.1)
+        axd["foil"].plot(self.geom.x, self.geom.y, c="black")
+        axd["foil"].fill(self.geom.x, self.geom.y, color="black", alpha=0.1)
         axd["foil"].plot(xs, self.f_z(xs), c="red", label="z=z(x) Camber line")
         axd["foil"].plot((0, 1), (0, 0), ls="-.", c="black")
         axd["foil"].set_xlabel("x/c")
         axd["foil"].set_ylabel("y/c")
         axd["foil"].set_aspect(1)
         hspace = xs[0::self.xres-1] - axd["foil"].get_xlim()
-        vspace = np.array([min(self.coords[1]), max(self.coords[1])]) - hspace
+        vspace = np.array([self.geom.y.min(), self.geom.y.max()]) - hspace
         axd["foil"].set_ylim(*vspace)
         axd["foil"].legend()
 
         # Plot the lift-curve
         alphas = np.linspace(np.radians(-20), np.radians(20), 2)
-        clift = [self.f_Cl(x) for x in alphas]
+        clift = self.f_Cl(alphas)
         zeroliftstr = "$\\alpha_{L=0}$="
         zeroliftstr += f"{np.degrees(self.zeroliftAoA_rad):.2f}"
         axd["lift"].plot(np.degrees(alphas), clift, "r")
@@ -109,7 +153,7 @@ class NACA4digit:
         axd["moment"].plot(zerocmax, 0, "x", c="blue", label=zerocmastr)
         axd["moment"].set_title("$c_{m,\\alpha}$ vs x/c")
         axd["moment"].set_xlabel("x/c")
-        axd["moment"].set_ylabel("d$c_m$ / d$\\alpha}$")
+        axd["moment"].set_ylabel("d$c_m$ / d$\\alpha$")
         axd["moment"].grid()
         axd["moment"].legend(title=staticcmomstr)
 
@@ -126,36 +170,31 @@ class NACA4digit:
         assert isinstance(nmax, int), "Argument nmax is of wrong type"
         assert nmax > 0, "nmax is too low"
 
-        def f_A0_integrand(x):
-            theta0 = np.arccos(1 - 2 * x)
-            result = self.f_dzdx(x) * 2 / np.sin(theta0)
-            return result
-
-        def f_An_integrand(x, n):
-            theta0 = np.arccos(1 - 2 * x)
-            result = self.f_dzdx(x) * np.cos(n * theta0) * 2 / np.sin(theta0)
-            return result
-
-        An = np.zeros(nmax+1)
-        An[0] = alpha_rad - 1 / np.pi * sig.quad(f_A0_integrand, 0, 1)[0]
-        for i in range(1, len(An)):
-            An[i] = 2 / np.pi
-            An[i] *= sig.quad(f_An_integrand, 0, 1, args=i, limit=100)[0]
+        if nmax < len(self._A_base):
+            An = self._A_base[:nmax+1].copy()
+        else:
+            maxcamber, loccamber, _ = _decode_NACA4digit(self.foil)
+            An = _f_A_base(maxcamber, loccamber, nmax)
+        An[0] = alpha_rad - An[0]
         return An
 
     def f_Cl(self, alpha_rad: float) -> float:
         """Return the Coefficient of lift at some Angle of Attack"""
-        An = self.f_An_fundamental(alpha_rad, nmax=1)
-
-        Cl = 2 * np.pi * (An[0] + An[1] / 2)
+        # Closed form in alpha from the cached coefficients (accepts arrays)
+        A = self._A_base
+        Cl = 2 * np.pi * (alpha_rad - A[0] + A[1] / 2)
         return Cl
 
     def f_cm(self, alpha_rad: float, xs: float = 0.25) -> float:
         """Return the moment coefficient of the aerofoil at some position"""
-        An = self.f_An_fundamental(alpha_rad, nmax=2)
-
-        Cm_LE = -np.pi / 2 * (An[0] + An[1] - An[2] / 2)
-        Cl = 2 * np.pi * (An[0] + An[1] / 2)
+        # Moment is affine in x about the leading edge, so arrays of positions
+        # broadcast directly against the (position independent) Cm_LE and Cl
+        xs = np.asarray(xs)
+        A = self._A_base
+        A0 = alpha_rad - A[0]
+
+        Cm_LE = -np.pi / 2 * (A0 + A[1] - A[2] / 2)
+        Cl = self.f_Cl(alpha_rad)
         Cm = Cm_LE + xs * Cl
         return Cm
 
@@ -163,9 +202,12 @@ class NACA4digit:
         """Return vortex sheet strength along chordline, at position x"""
         An = self.f_An_fundamental(alpha_rad)
 
+        xs = np.asarray(xs, dtype=float)
         theta = np.arccos(1 - 2 * xs)
-        gamma = An[0] * (1 + np.cos(theta)) / np.sin(theta)
-        gamma += np.sum([An[i] * np.sin(i * theta) for i in range(1, len(An))])
+        # (1 + cos(theta)) / sin(theta) reduces to sqrt((1 - x) / x)
+        gamma = An[0] * np.sqrt((1 - xs) / xs)
+        ns = np.arange(1, len(An))
+        gamma += np.tensordot(An[1:], np.sin(np.multiply.outer(ns, theta)), 1)
         gamma *= 2 * vfreestream_mps
         return gamma
 
@@ -4,21 +4,96 @@ Created on Sat Feb  5 07:51:31 2022
 
 @author: yr3g17
 """
+from dataclasses import dataclass, fields
+import functools
+
 import numpy as np
-import re
+
+
+@dataclass(frozen=True, eq=False)
+class FoilGeom:
+    """
+    Surface geometry of an aerofoil, stored as a structure of float32 arrays
+
+    All arrays share the same ordering, running from the upper surface trailing
+    edge, to the leading edge, and back along the lower surface to the trailing
+    edge.
+
+    Attributes
+    ----------
+    x : np.ndarray
+        Non-dimensional chordwise coordinate x/c of the surface.
+    y : np.ndarray
+        Non-dimensional vertical coordinate y/c of the surface.
+    z : np.ndarray
+        Camber line position at the chord station each surface point is
+        projected from.
+    dzdx : np.ndarray
+        Camber line gradient at the chord station each surface point is
+        projected from.
+    yt : np.ndarray
+        Half-thickness at the chord station each surface point is projected
+        from.
+
+    """
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    dzdx: np.ndarray
+    yt: np.ndarray
+
+
+def _f_z(x, maxcamber: float, loccamber: float):
+    """Return camber line position for non-dimensional chord position"""
+    commonterm = 2 * loccamber * x - x**2
+    z = np.where(
+        x <= loccamber,
+        maxcamber * loccamber**-2 * commonterm,
+        maxcamber * (1 - loccamber)**-2 * (1 - 2 * loccamber + commonterm))
+    return z
+
+
+def _f_dzdx(x, maxcamber: float, loccamber: float):
+    """Return gradient of camber line for non-dimensional chord position"""
+    dzdx = 2 * maxcamber * (loccamber - x) * np.where(
+        x <= loccamber, loccamber**-2, (1-loccamber)**-2)
+    return dzdx
+
+
+def _f_yt(x, thickness: float):
+    """Return the half-thickness of the aerofoil at some chord position"""
+    # The polynomial formula for half-thickness (surface to camber line)
+    c0, c1, c2, c3, c4 = 0.2969, -0.1260, -0.3516, 0.2843, -0.1015
+
+    # Horner's method on the integer powers, plus the sqrt(x) term
+    y_halfthickness = (((c4 * x + c3) * x + c2) * x + c1) * x
+    y_halfthickness += c0 * np.sqrt(x)
+    y_halfthickness *= 5 * thickness
+    return y_halfthickness
+
+
+def _decode_NACA4digit(foilcode: str) -> tuple:
+    """Return max camber, location of max camber, and thickness of a foil"""
+    d0, d1, d2, d3 = (ord(c) - 48 for c in foilcode)
+
+    # Decode the aerofoil code
+    maxcamber = d0 / 100
+    loccamber = d1 / 10 if d1 > 0 else 0.3  # avoid Zerodivision
+    thickness = (10 * d2 + d3) / 100
+    return maxcamber, loccamber, thickness
 
 
 def parse_NACA4digit(foilcode: str, xres: int = None) -> tuple:
     """
-    Return the coordinates of a NACA 4-digit foil, and a camber line function
+    Return the geometry of a NACA 4-digit foil, and camber line functions
 
     Parameters
     ----------
     foilcode : str
         The four-digit NACA aerofoil code, e.g. '0012', '2412'.
     xres : int, optional
-        The number of points describing each of upper and lower surfaces. The
-        default is 100.
+        The number of (cosine-spaced) points describing each of upper and lower
+        surfaces. The default is 100.
 
     Raises
     ------
@@ -28,86 +103,81 @@ def parse_NACA4digit(foilcode: str, xres: int = None) -> tuple:
     Returns
     -------
     tuple
-        A two-element tuple containing a tuple of surface coordinates, and a
-        function that returns the position of camber at some non-dimensional
-        position along the chord x/c.
+        A three-element tuple containing the FoilGeom surface geometry, and
+        functions that return the position and gradient of camber at some
+        non-dimensional position along the chord x/c.
 
     """
     if xres is None:
         xres = 100
 
     # Parse the 4 digit NACA code
-    try:
-        assert len(re.findall("[0-9]", foilcode)) == 4
-        float(foilcode)
-    except (AssertionError, ValueError):
+    if not (isinstance(foilcode, str) and len(foilcode) == 4
+            and foilcode.isascii() and foilcode.isdigit()):
         raise ValueError(f"Invalid 4-digit NACA code '{foilcode}'")
-    else:
-        digits = [int(x) for x in re.findall("[0-9]", foilcode)]
-
-    # Decode the aerofoil code
-    maxcamber = digits[0] / 100
-    loccamber = digits[1] / 10 if digits[1] > 0 else 0.3  # avoid Zerodivision
-    thickness = (10 * digits[2] + digits[3]) / 100
-
-    # Find the camber line of the aerofoil
-    def f_z(x):
-        """Return camber line position for non-dimensional chord position"""
-        commonterm = 2 * loccamber * x - x**2
-        z = np.where(
-            x <= loccamber,
-            maxcamber * loccamber**-2 * commonterm,
-            maxcamber * (1 - loccamber)**-2 * (1 - 2 * loccamber + commonterm))
-        return z
-
-    # Find the gradient of the camber line of the aerofoil
-    def f_dzdx(x):
-        """Return gradient of camber line for non-dimensional chord position"""
-        dzdx = 2 * maxcamber * (loccamber - x) * np.where(
-            x <= loccamber, loccamber**-2, (1-loccamber)**-2)
-        return dzdx
-
-    # Arctan of the camber gradient gives angle at which half-thickness applies
-    def f_ztheta(x):
-        """Return angle of half-thickness application to the camber"""
-        theta_rad = np.arctan(f_dzdx(x))
-        return theta_rad
-
-    # The polynomial formula for half-thickness (surface to camber line)
-    polyco = [0.2969, -0.1260, -0.3516, 0.2843, -0.1015]
-
-    def f_yt(x):
-        """Return the half-thickness of the aerofoil at some chord position"""
-        y_halfthickness = 0
-        for i in range(5):
-            y_halfthickness += polyco[i]*x**0.5 if i == 0 else polyco[i]*x**i
-        y_halfthickness *= 5 * thickness
-        return y_halfthickness
-
-    # Begin coordinate system from upper TE to LE to lower TE
-    x_upper = np.linspace(1, 0, xres)
-    x_lower = np.flip(x_upper)[1:]
-
-    # Calculate x-coordinates for upper and lower surfaces
-    yt_upper = f_yt(x_upper)
-    yt_lower = f_yt(x_lower)
-    xs_upper = x_upper - yt_upper * np.sin(f_ztheta(x_upper))
-    xs_lower = x_lower + yt_lower * np.sin(f_ztheta(x_lower))
-
-    # Upper and lower camber position (identical, but reversed orders)
-    z_upper = f_z(x_upper)
-    z_lower = f_z(x_lower)
-
-    # Calculate y-coordinates for upper and lower surfaces
-    ys_upper = z_upper + yt_upper * np.cos(f_ztheta(x_upper))
-    ys_lower = z_lower - yt_lower * np.cos(f_ztheta(x_lower))
-
-    xs = np.concatenate((xs_upper, xs_lower))
-    ys = np.concatenate((ys_upper, ys_lower))
 
-    return np.array([xs, ys]), f_z, f_dzdx
+    # Repeat requests for the same foil are served from the cache. The arrays
+    # of the returned geometry are shared between callers, so are read-only
+    return _parse_NACA4digit(foilcode, xres)
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_NACA4digit(foilcode: str, xres: int) -> tuple:
+    """Return the geometry and camber functions of a validated NACA code"""
+    maxcamber, loccamber, thickness = _decode_NACA4digit(foilcode)
+
+    # Camber and half-thickness functions, bound to this aerofoil's parameters
+    f_z = functools.partial(_f_z, maxcamber=maxcamber, loccamber=loccamber)
+    f_dzdx = functools.partial(
+        _f_dzdx, maxcamber=maxcamber, loccamber=loccamber)
+    f_yt = functools.partial(_f_yt, thickness=thickness)
+
+    def _surface(x, geom):
+        """Fill the arrays of geom, given ascending chordwise stations x"""
+        # Outline runs from upper TE to LE to lower TE, so upper surface values
+        # are written in reverse and the shared LE station is stored only once
+        upper, lower = slice(xres - 1, None, -1), slice(xres, None)
+
+        # Fused evaluation of camber, gradient, and thickness in a single pass,
+        # splitting the (monotonic) x once to evaluate each camber segment
+        k = np.searchsorted(x, loccamber, side="right")
+        x_fore, x_aft = x[:k], x[k:]
+        coef_fore, coef_aft = loccamber**-2, (1 - loccamber)**-2
+        z, dzdx, yt = geom.z[upper], geom.dzdx[upper], geom.yt[upper]
+        z[:k] = maxcamber * coef_fore * (2 * loccamber * x_fore - x_fore**2)
+        z[k:] = maxcamber * coef_aft * (
+            1 - 2 * loccamber + 2 * loccamber * x_aft - x_aft**2)
+        dzdx[:k] = 2 * maxcamber * coef_fore * (loccamber - x_fore)
+        dzdx[k:] = 2 * maxcamber * coef_aft * (loccamber - x_aft)
+        yt[:] = f_yt(x)
+        for station_values in (geom.z, geom.dzdx, geom.yt):
+            station_values[lower] = station_values[upper][1:]
+
+        # sin and cos of arctan(dzdx), without evaluating any transcendentals
+        cos_t = 1 / np.sqrt(1 + dzdx * dzdx)
+        sin_t = dzdx * cos_t
+        dx, dy = yt * sin_t, yt * cos_t
+        np.subtract(x, dx, out=geom.x[upper])
+        np.add(z, dy, out=geom.y[upper])
+        np.add(x[1:], dx[1:], out=geom.x[lower])
+        np.subtract(z[1:], dy[1:], out=geom.y[lower])
+        return geom
+
+    # Both surfaces share the same chordwise stations, evaluated LE to TE and
+    # cosine-clustered to resolve the curvature near the leading/trailing edge.
+    # Geometry is only for display, so single precision is plenty (the camber
+    # functions used in the aerodynamic analysis remain in double precision)
+    theta_stations = np.linspace(0, np.pi, xres, dtype=np.float32)
+    x_stations = (1 - np.cos(theta_stations)) / 2
+    geom = FoilGeom(*(
+        np.empty(2 * xres - 1, dtype=np.float32) for _ in fields(FoilGeom)))
+    _surface(x_stations, geom)
+    for field in fields(geom):
+        getattr(geom, field.name).flags.writeable = False
+
+    return geom, f_z, f_dzdx
 
 
 if __name__ == "__main__":
 
-    xy, f_z, f_dz = parse_NACA4digit(foilcode="2412")
+    geom, f_z, f_dz = parse_NACA4digit(foilcode="2412")